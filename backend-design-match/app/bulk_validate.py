@@ -0,0 +1,224 @@
+"""
+Offline bulk validation of Figma/UI pairs without the API server.
+
+Usage (from the `app` directory):
+
+    python bulk_validate.py PAIRS --output results.jsonl [--workers N]
+                            [--reports-dir DIR] [--resume] [--compare-visuals]
+
+PAIRS is either a directory containing `figma/` and `ui/` subfolders whose
+files are paired by name, or a manifest file (`.jsonl` or `.csv`) with
+`figma`, `ui` and optional `id` fields. One result is written per line as
+JSON as soon as each pair finishes.
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from multiprocessing import Pool
+from pathlib import Path
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+
+_reports_dir = None
+_compare_visuals = False
+
+
+def load_pairs(source):
+    """Return a list of {"id", "figma", "ui"} dicts from a directory or manifest."""
+    source = Path(source)
+    if source.is_dir():
+        return _pairs_from_directory(source)
+    if source.suffix.lower() == ".csv":
+        with open(source, newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+    else:
+        with open(source, encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    base = source.parent
+    pairs = []
+    for idx, row in enumerate(rows):
+        pairs.append(
+            {
+                "id": str(row.get("id") or idx),
+                "figma": str(base / row["figma"]),
+                "ui": str(base / row["ui"]),
+            }
+        )
+    return pairs
+
+
+def _pairs_from_directory(directory):
+    def images(folder):
+        return {
+            p.stem: p
+            for p in sorted((directory / folder).iterdir())
+            if p.suffix.lower() in IMAGE_EXTENSIONS
+        }
+
+    figma_images, ui_images = images("figma"), images("ui")
+    for name in sorted(figma_images.keys() ^ ui_images.keys()):
+        print(f"⚠️ Skipping {name}: no matching figma/ui pair", file=sys.stderr)
+
+    return [
+        {"id": name, "figma": str(figma_images[name]), "ui": str(ui_images[name])}
+        for name in sorted(figma_images.keys() & ui_images.keys())
+    ]
+
+
+def completed_ids(output_path):
+    """IDs that already have a successful result in `output_path`."""
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # A line cut short by an interrupted run
+            if record.get("status") == "ok":
+                done.add(record["id"])
+    return done
+
+
+def report_name(pair_id):
+    """Filesystem-safe report name for a pair ID taken from a manifest."""
+    return re.sub(r"[^A-Za-z0-9._-]", "_", pair_id).lstrip(".") or "pair"
+
+
+def _init_worker(reports_dir, threads, compare_visuals):
+    """Load the models once per worker and keep each worker to its own cores."""
+    global _reports_dir, _compare_visuals
+    _reports_dir = reports_dir
+    _compare_visuals = compare_visuals
+
+    import cv2
+    import torch
+
+    cv2.setNumThreads(threads)
+    torch.set_num_threads(threads)
+
+    from validation.pipeline import get_model
+
+    get_model()
+    if compare_visuals:
+        from utils.embeddings import get_crop_embedder
+
+        get_crop_embedder()
+
+
+def _validate_pair(pair):
+    from utils.storage import get_content_store
+    from validation.pipeline import render_html_report, run_validation
+
+    started = time.perf_counter()
+    record = dict(pair)
+    try:
+        result = run_validation(
+            pair["figma"], pair["ui"], compare_visuals=_compare_visuals
+        )
+        if _reports_dir:
+            report_path = Path(_reports_dir) / f"{report_name(pair['id'])}.html"
+            report_path.write_text(render_html_report(result), encoding="utf-8")
+            record["report"] = str(report_path)
+    except Exception as e:
+        # Record the failure here; raising would abort the whole pool run
+        record.update(status="error", error=str(e))
+    else:
+        record.update(
+            status="ok",
+            overall_match_score=result["overall_match_score"],
+            layout_similarity=result["layout_similarity"],
+            text_similarity=result["text_similarity"],
+            issues=result["issues"],
+            metrics=result["metrics"],
+        )
+        if _compare_visuals:
+            record["element_similarities"] = result["element_similarities"]
+            record["embedding_stats"] = result["embedding_stats"]
+    finally:
+        # Drop this pair's raw decode cache; pairs still running in other
+        # workers hold leases on theirs, so only finished caches go
+        get_content_store().evict()
+    record["seconds"] = round(time.perf_counter() - started, 3)
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("pairs", help="Directory with figma/ and ui/, or a manifest")
+    parser.add_argument("--output", "-o", required=True, help="JSON Lines output")
+    parser.add_argument(
+        "--workers", "-w", type=int, default=os.cpu_count(), help="Worker processes"
+    )
+    parser.add_argument(
+        "--threads-per-worker",
+        type=int,
+        default=1,
+        help="Torch/OpenCV threads per worker (keep workers * threads <= cores)",
+    )
+    parser.add_argument(
+        "--compare-visuals",
+        action="store_true",
+        help="Also compare matched elements by deep embedding similarity",
+    )
+    parser.add_argument("--reports-dir", help="Write an HTML report per pair here")
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip pairs that already succeeded in the output file",
+    )
+    args = parser.parse_args(argv)
+
+    pairs = load_pairs(args.pairs)
+    if args.resume:
+        done = completed_ids(args.output)
+        pairs = [pair for pair in pairs if pair["id"] not in done]
+        print(f"⏩ Resuming: {len(done)} already done, {len(pairs)} remaining")
+
+    if args.reports_dir:
+        Path(args.reports_dir).mkdir(parents=True, exist_ok=True)
+
+    # Raw image caches go to a per-run store that the workers inherit through
+    # the environment; a zero size budget makes every eviction drop all
+    # unleased caches, and the store is removed when the run ends
+    storage_root = tempfile.mkdtemp(prefix="designmatch-")
+    os.environ["STORAGE_ROOT"] = storage_root
+    os.environ["STORAGE_MAX_GB"] = "0"
+
+    failures = 0
+    started = time.perf_counter()
+    mode = "a" if args.resume else "w"
+    try:
+        with open(args.output, mode, encoding="utf-8") as out, Pool(
+            processes=max(1, min(args.workers, len(pairs) or 1)),
+            initializer=_init_worker,
+            initargs=(args.reports_dir, args.threads_per_worker, args.compare_visuals),
+        ) as pool:
+            for record in pool.imap_unordered(_validate_pair, pairs):
+                out.write(json.dumps(record) + "\n")
+                out.flush()
+                if record["status"] != "ok":
+                    failures += 1
+                    print(f"❌ {record['id']}: {record['error']}", file=sys.stderr)
+    finally:
+        shutil.rmtree(storage_root, ignore_errors=True)
+
+    elapsed = time.perf_counter() - started
+    print(
+        f"✅ Validated {len(pairs)} pairs in {elapsed:.1f}s "
+        f"({failures} failed) -> {args.output}"
+    )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
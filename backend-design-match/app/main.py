@@ -6,6 +6,7 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import RedirectResponse
 from mangum import Mangum
 from tortoise.contrib.fastapi import register_tortoise
+from utils.storage import get_content_store
 from validation.upload import router as upload_router
 from validation.validate import router as validate_router
 
@@ -38,6 +39,14 @@ register_tortoise(
 )
 
 
+@app.on_event("startup")
+async def start_storage_eviction():
+    # Expire uploads, rendered pages and image caches by age and total size;
+    # serve.py sets STORAGE_EVICTION=parent and runs one evictor for all workers
+    if os.getenv("STORAGE_EVICTION", "worker") == "worker":
+        get_content_store().start_background_eviction()
+
+
 # Redirect root ("/") to Swagger UI docs ("/docs")
 @app.get("/", include_in_schema=False)
 async def root():
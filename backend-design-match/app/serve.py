@@ -0,0 +1,302 @@
+"""
+Production server with shared model weights and a global CPU thread budget.
+
+Usage (from the `app` directory, Linux only):
+
+    python serve.py [--workers N] [--cpu-budget C] [--host H] [--port P]
+                    [--preload-deep-model] [--memory-report-interval S]
+                    [--eviction-interval S]
+
+The parent process loads the models once, then forks the uvicorn workers,
+so the weights are shared copy-on-write instead of loaded per worker. The
+CPU budget (default: all cores) is split evenly between workers, and each
+worker's torch, OpenCV and Tesseract thread counts are capped to its share.
+The parent also runs the single content-store evictor for all workers.
+"""
+
+import argparse
+import gc
+import os
+import shlex
+import shutil
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+# Variables read by the native thread pools when they are first loaded
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+# A worker that dies sooner than this after starting counts as a fast failure;
+# restarts after fast failures back off exponentially, and the server gives
+# up after MAX_FAST_FAILURES in a row instead of fork-looping on a bad build
+FAST_FAILURE_SECONDS = 10
+MAX_FAST_FAILURES = 5
+MAX_RESTART_DELAY = 30
+
+
+def restart_delay(fast_failures):
+    """Seconds to wait before replacing a worker after `fast_failures` in a row."""
+    if not fast_failures:
+        return 0
+    return min(MAX_RESTART_DELAY, 2 ** (fast_failures - 1))
+
+
+def thread_budget(cpu_budget, workers):
+    """Threads each worker may use so that all workers together fit the budget."""
+    return max(1, cpu_budget // max(1, workers))
+
+
+def configure_thread_env(threads):
+    """Cap native thread pools; must run before torch/cv2 are imported."""
+    for var in THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    os.environ["OCR_MAX_CONCURRENCY"] = str(threads)
+
+
+def wrap_tesseract():
+    """
+    Point pytesseract at a wrapper script that runs Tesseract single-threaded.
+
+    Tesseract parallelism comes from running pages concurrently, not OpenMP.
+    OMP_THREAD_LIMIT in the server's own environment would also cap torch's
+    OpenMP pool at one thread, so it is set only for the subprocess. Returns
+    the wrapper path for removal on shutdown.
+    """
+    from pytesseract import pytesseract
+
+    cmd = pytesseract.tesseract_cmd
+    if not os.access(cmd, os.X_OK):
+        cmd = shutil.which("tesseract") or cmd
+    fd, wrapper = tempfile.mkstemp(prefix="tesseract-", suffix=".sh")
+    with os.fdopen(fd, "w") as f:
+        f.write(f'#!/bin/sh\nOMP_THREAD_LIMIT=1 exec {shlex.quote(cmd)} "$@"\n')
+    os.chmod(wrapper, 0o755)
+    pytesseract.tesseract_cmd = wrapper
+    return wrapper
+
+
+def apply_thread_limits(threads):
+    import cv2
+    import torch
+
+    torch.set_num_threads(threads)
+    cv2.setNumThreads(threads)
+
+
+def worker_memory(pid):
+    """Resident, unique and proportional memory of a process, in MB."""
+    import psutil
+
+    proc = psutil.Process(pid)
+    try:
+        info = proc.memory_full_info()
+    except psutil.AccessDenied:
+        info = proc.memory_info()
+    mb = 1024 * 1024
+    return {
+        "pid": pid,
+        "rss_mb": round(info.rss / mb, 1),
+        "uss_mb": round(info.uss / mb, 1) if hasattr(info, "uss") else None,
+        "pss_mb": round(info.pss / mb, 1) if hasattr(info, "pss") else None,
+    }
+
+
+def log_memory(workers):
+    total_uss = 0.0
+    for pid in sorted(workers):
+        try:
+            mem = worker_memory(pid)
+        except Exception:
+            continue
+        total_uss += mem["uss_mb"] or 0.0
+        print(
+            f"📊 worker {pid}: rss={mem['rss_mb']}MB "
+            f"uss={mem['uss_mb']}MB pss={mem['pss_mb']}MB"
+        )
+    print(f"📊 workers private memory total: {total_uss:.1f}MB")
+
+
+def evict_storage():
+    """One eviction pass over the content store shared by all workers."""
+    from utils.storage import get_content_store
+
+    try:
+        removed, freed = get_content_store().evict()
+        if removed:
+            print(f"🧹 Evicted {removed} files ({freed / 1e6:.1f} MB)")
+    except Exception as e:
+        print(f"❌ Storage eviction error: {e}")
+
+
+def preload(preload_deep_model):
+    """Import the app (loading YOLO) and optional models in the parent."""
+    import numpy as np
+    from main import app
+    from validation.pipeline import get_model
+
+    # The first predict fuses Conv+BN into new weight tensors; run it here so
+    # the fused weights are shared too instead of rebuilt in every worker
+    get_model()(np.zeros((640, 640, 3), dtype=np.uint8), verbose=False)
+    if preload_deep_model:
+        from utils.embeddings import get_crop_embedder
+
+        get_crop_embedder()
+    return app
+
+
+def add_worker_route(app, threads):
+    @app.get("/system/worker", include_in_schema=False)
+    async def worker_status():
+        return {"threads": threads, **worker_memory(os.getpid())}
+
+
+def bind_socket(host, port, backlog=2048):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def spawn_worker(app, sock, threads, log_level):
+    pid = os.fork()
+    if pid:
+        return pid
+
+    # Child: restore default signal handling and run uvicorn on the shared socket
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    import uvicorn
+
+    apply_thread_limits(threads)
+    config = uvicorn.Config(app, log_level=log_level, lifespan="on")
+    uvicorn.Server(config).run(sockets=[sock])
+    os._exit(0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", "-w", type=int, default=2)
+    parser.add_argument(
+        "--cpu-budget",
+        type=int,
+        default=int(os.getenv("CPU_BUDGET", os.cpu_count() or 1)),
+        help="Total threads shared by all workers (default: all cores)",
+    )
+    parser.add_argument(
+        "--preload-deep-model",
+        action="store_true",
+        help="Also preload ResNet18 for element visual comparison",
+    )
+    parser.add_argument(
+        "--memory-report-interval",
+        type=float,
+        default=300,
+        help="Seconds between per-worker memory reports (0 disables)",
+    )
+    parser.add_argument(
+        "--eviction-interval",
+        type=float,
+        default=300,
+        help="Seconds between storage evictions, run once here for all workers",
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    if not hasattr(os, "fork"):
+        sys.exit("serve.py needs fork(); use `uvicorn main:app` on this platform")
+
+    threads = thread_budget(args.cpu_budget, args.workers)
+    configure_thread_env(threads)
+    # Workers skip their own evictor; the parent loop below runs the only one
+    os.environ["STORAGE_EVICTION"] = "parent"
+    apply_thread_limits(threads)
+    print(f"🧮 CPU budget {args.cpu_budget}: {args.workers} workers x {threads} threads")
+
+    app = preload(args.preload_deep_model)
+    add_worker_route(app, threads)
+    tesseract_wrapper = wrap_tesseract()
+
+    # Move everything loaded so far out of GC tracking so collections in the
+    # workers do not touch (and un-share) the preloaded objects' pages
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    workers = {}  # pid -> start time
+    for _ in range(args.workers):
+        workers[spawn_worker(app, sock, threads, args.log_level)] = time.monotonic()
+    print(f"🚀 Serving on {args.host}:{args.port} with workers {sorted(workers)}")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    exit_code = 0
+    fast_failures = 0
+    restarts = []  # monotonic times at which to spawn replacement workers
+    next_report = time.monotonic() + args.memory_report_interval
+    next_eviction = time.monotonic()
+    while workers or (restarts and not stopping):
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            workers.clear()  # No children left; only pending restarts remain
+            pid = 0
+        if pid:
+            started = workers.pop(pid, None)
+            if stopping or started is None:
+                continue
+            if time.monotonic() - started < FAST_FAILURE_SECONDS:
+                fast_failures += 1
+            else:
+                fast_failures = 0
+            if fast_failures >= MAX_FAST_FAILURES:
+                print(
+                    "❌ Workers keep exiting right after start "
+                    f"({fast_failures} in a row), shutting down"
+                )
+                exit_code = 1
+                stop(None, None)
+                continue
+            delay = restart_delay(fast_failures)
+            print(f"⚠️ Worker {pid} exited ({status}), restarting in {delay}s")
+            restarts.append(time.monotonic() + delay)
+            continue
+
+        now = time.monotonic()
+        if not stopping and restarts and now >= min(restarts):
+            restarts.remove(min(restarts))
+            workers[spawn_worker(app, sock, threads, args.log_level)] = now
+            continue
+
+        if args.memory_report_interval and time.monotonic() >= next_report:
+            log_memory(workers)
+            next_report = time.monotonic() + args.memory_report_interval
+        if args.eviction_interval and time.monotonic() >= next_eviction:
+            evict_storage()
+            next_eviction = time.monotonic() + args.eviction_interval
+        time.sleep(0.5)
+
+    sock.close()
+    os.unlink(tesseract_wrapper)
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -7,3 +7,40 @@ def compute_iou(boxA, boxB):
     boxAArea = (boxA[2] - boxA[0]) * (boxA[3] - boxA[1])
     boxBArea = (boxB[2] - boxB[0]) * (boxB[3] - boxB[1])
     return interArea / float(boxAArea + boxBArea - interArea)
+
+
+def match_elements(figma_elements, ui_elements, figma_shape, ui_shape):
+    """
+    Pair Figma and UI detections that share a label and roughly a position.
+
+    Figma boxes are scaled into the UI page's coordinate frame, then pairs are
+    taken greedily by centre distance. A pair is accepted while the centres
+    are no further apart than the larger side of the scaled Figma box.
+
+    Returns a list of (figma_element, ui_element) tuples.
+    """
+    sx = ui_shape[1] / figma_shape[1]
+    sy = ui_shape[0] / figma_shape[0]
+
+    candidates = []
+    for fi, f_el in enumerate(figma_elements):
+        fx1, fy1, fx2, fy2 = f_el["bbox"]
+        fx1, fx2, fy1, fy2 = fx1 * sx, fx2 * sx, fy1 * sy, fy2 * sy
+        fcx, fcy = (fx1 + fx2) / 2, (fy1 + fy2) / 2
+        reach = max(fx2 - fx1, fy2 - fy1)
+        for ui_idx, u_el in enumerate(ui_elements):
+            if u_el["label"] != f_el["label"]:
+                continue
+            ux1, uy1, ux2, uy2 = u_el["bbox"]
+            distance = ((ux1 + ux2) / 2 - fcx) ** 2 + ((uy1 + uy2) / 2 - fcy) ** 2
+            if distance <= reach**2:
+                candidates.append((distance, fi, ui_idx))
+
+    matches, used_figma, used_ui = [], set(), set()
+    for _, fi, ui_idx in sorted(candidates):
+        if fi in used_figma or ui_idx in used_ui:
+            continue
+        used_figma.add(fi)
+        used_ui.add(ui_idx)
+        matches.append((figma_elements[fi], ui_elements[ui_idx]))
+    return matches
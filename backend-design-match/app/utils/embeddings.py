@@ -0,0 +1,109 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+import torch
+from utils.model_loader import get_deep_model
+
+EMBED_SIZE = 224
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+def crop_key(crop):
+    """Content hash of a crop; identical pixels map to the same cache entry."""
+    digest = hashlib.blake2b(np.ascontiguousarray(crop).tobytes(), digest_size=16)
+    digest.update(str(crop.shape).encode("ascii"))
+    return digest.hexdigest()
+
+
+def _preprocess(crops):
+    batch = np.empty((len(crops), EMBED_SIZE, EMBED_SIZE, 3), dtype=np.float32)
+    for i, crop in enumerate(crops):
+        size = (EMBED_SIZE, EMBED_SIZE)
+        resized = cv2.resize(crop, size, interpolation=cv2.INTER_AREA)
+        batch[i] = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
+    batch = (batch / 255.0 - IMAGENET_MEAN) / IMAGENET_STD
+    return torch.from_numpy(batch.transpose(0, 3, 1, 2).copy())
+
+
+class CropEmbedder:
+    """
+    Batched ResNet18 embeddings for element crops with an LRU embedding cache.
+
+    Crops are keyed by content hash, so elements repeated across designs or
+    requests are embedded once per process. `stats` tracks throughput. The
+    cache and stats are shared by concurrent requests and guarded by a lock;
+    inference itself runs outside it.
+    """
+
+    def __init__(self, batch_size=32, cache_size=4096):
+        model = get_deep_model()
+        # Drop the classifier head; the pooled 512-d features share the weights
+        self.model = torch.nn.Sequential(*list(model.children())[:-1]).eval()
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"crops": 0, "embedded": 0, "cache_hits": 0, "seconds": 0.0}
+
+    def embed(self, crops):
+        """Return an (N, 512) array of L2-normalised embeddings for `crops`."""
+        started = time.perf_counter()
+        keys = [crop_key(crop) for crop in crops]
+
+        # Vectors for this call are kept locally, so another request evicting
+        # them from the shared cache cannot pull them out from under us
+        vectors, missing = {}, {}
+        with self._lock:
+            for key, crop in zip(keys, crops):
+                if key in self._cache:
+                    self._cache.move_to_end(key)
+                    vectors[key] = self._cache[key]
+                elif key not in missing:
+                    missing[key] = crop
+
+        missing_keys = list(missing)
+        for start in range(0, len(missing_keys), self.batch_size):
+            batch_keys = missing_keys[start : start + self.batch_size]
+            with torch.inference_mode():
+                features = self.model(_preprocess([missing[k] for k in batch_keys]))
+            features = torch.nn.functional.normalize(features.flatten(1), dim=1)
+            vectors.update(zip(batch_keys, features.numpy()))
+
+        embeddings = np.stack([vectors[key] for key in keys]) if keys else None
+
+        with self._lock:
+            for key in missing_keys:
+                self._cache[key] = vectors[key]
+                self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+            self.stats["crops"] += len(crops)
+            self.stats["embedded"] += len(missing_keys)
+            self.stats["cache_hits"] += len(crops) - len(missing_keys)
+            self.stats["seconds"] += time.perf_counter() - started
+        if embeddings is None:
+            return np.empty((0, 512), dtype=np.float32)
+        return embeddings
+
+    def crops_per_second(self):
+        with self._lock:
+            if not self.stats["seconds"]:
+                return 0.0
+            return self.stats["crops"] / self.stats["seconds"]
+
+
+_embedder = None
+
+
+def get_crop_embedder():
+    """Process-wide embedder, so the model and cache are loaded once per worker."""
+    global _embedder
+    if _embedder is None:
+        _embedder = CropEmbedder()
+    return _embedder
@@ -1,27 +1,22 @@
-import shutil
 from pathlib import Path
 
 from fastapi import UploadFile
+from utils.storage import get_content_store
 
 temp_dir = Path("temp")
 temp_dir.mkdir(parents=True, exist_ok=True)
 
 
-async def save_upload_file(file: UploadFile, destination: Path) -> Path:
+async def store_upload_file(file: UploadFile, suffix: str) -> Path:
     """
-    Save an uploaded file to the specified destination.
+    Save an uploaded file in the content-addressed store.
 
     Args:
         file: The uploaded file
-        destination: Path where the file should be saved
+        suffix: File extension to keep on the stored artifact
 
     Returns:
-        Path to the saved file
+        Path to the stored file (shared with identical earlier uploads)
     """
-    destination.parent.mkdir(parents=True, exist_ok=True)
-
     content = await file.read()
-    with open(destination, "wb") as f:
-        f.write(content)
-
-    return destination
+    return get_content_store().put_bytes(content, suffix)
@@ -0,0 +1,102 @@
+import cv2
+
+# Threshold used to separate dark text from light backgrounds
+TEXT_BINARY_THRESHOLD = 150
+
+# Width that whole-page comparisons (SSIM) are run at
+COMPARE_WIDTH = 720
+
+
+class ImageContext:
+    """
+    Per-request wrapper around a decoded BGR image.
+
+    Grayscale, binarized and downscaled views are computed lazily on first
+    access and cached, so every stage of a validation shares one conversion
+    instead of redoing it.
+    """
+
+    def __init__(self, image, offset=0):
+        self.image = image
+        self.offset = offset  # Row of this tile within the full page
+        self._gray = None
+        self._binary = None
+        self._downscaled = {}
+        self._downscaled_gray = {}
+
+    @classmethod
+    def from_path(cls, path):
+        """Decode an image from disk, returning None if it cannot be read."""
+        image = cv2.imread(path)
+        if image is None:
+            return None
+        return cls(image)
+
+    @property
+    def shape(self):
+        return self.image.shape
+
+    @property
+    def height(self):
+        return self.image.shape[0]
+
+    @property
+    def width(self):
+        return self.image.shape[1]
+
+    @property
+    def gray(self):
+        if self._gray is None:
+            self._gray = cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+        return self._gray
+
+    @property
+    def binary(self):
+        """Inverted binary mask where dark (text) pixels are white."""
+        if self._binary is None:
+            _, self._binary = cv2.threshold(
+                self.gray, TEXT_BINARY_THRESHOLD, 255, cv2.THRESH_BINARY_INV
+            )
+        return self._binary
+
+    def _scaled_size(self, max_width):
+        if self.width <= max_width:
+            return self.width, self.height
+        scale = max_width / self.width
+        return max_width, max(1, round(self.height * scale))
+
+    def downscaled(self, max_width=COMPARE_WIDTH):
+        """BGR image shrunk to at most `max_width` pixels wide."""
+        if max_width not in self._downscaled:
+            size = self._scaled_size(max_width)
+            if size == (self.width, self.height):
+                self._downscaled[max_width] = self.image
+            else:
+                self._downscaled[max_width] = cv2.resize(
+                    self.image, size, interpolation=cv2.INTER_AREA
+                )
+        return self._downscaled[max_width]
+
+    def downscaled_gray(self, max_width=COMPARE_WIDTH):
+        """Grayscale image shrunk to at most `max_width` pixels wide."""
+        if max_width not in self._downscaled_gray:
+            size = self._scaled_size(max_width)
+            if size == (self.width, self.height):
+                self._downscaled_gray[max_width] = self.gray
+            else:
+                self._downscaled_gray[max_width] = cv2.resize(
+                    self.gray, size, interpolation=cv2.INTER_AREA
+                )
+        return self._downscaled_gray[max_width]
+
+    def crop(self, bbox):
+        """Zero-copy view of the (x1, y1, x2, y2) region."""
+        x1, y1, x2, y2 = bbox
+        return self.image[max(0, y1) : max(0, y2), max(0, x1) : max(0, x2)]
+
+
+def as_image_context(image):
+    """Wrap a raw BGR array in an ImageContext, passing contexts/readers through."""
+    if hasattr(image, "downscaled_gray"):
+        return image
+    return ImageContext(image)
@@ -0,0 +1,161 @@
+import numpy as np
+
+# Bits kept per channel when quantising colours (4 -> 16 levels, 4096 bins)
+COLOR_BITS = 4
+COLOR_BINS = 1 << (3 * COLOR_BITS)
+
+FONT_SIZE_TOLERANCE = 0.2  # Relative text-height difference tolerated
+BUTTON_SIZE_TOLERANCE = 0.1  # Relative width/height difference tolerated
+MIN_PIXEL_DELTA = 3  # Differences smaller than this are rendering noise
+COLOR_DISTANCE_THRESHOLD = 48.0  # Euclidean BGR distance between dominant colours
+
+
+def quantize_colors(image):
+    """Map each BGR pixel to a single bin index in one vectorised pass."""
+    shift = 8 - COLOR_BITS
+    q = image.reshape(-1, 3).astype(np.uint16) >> shift
+    return (q[:, 0] << (2 * COLOR_BITS)) | (q[:, 1] << COLOR_BITS) | q[:, 2]
+
+
+def _bin_to_bgr(index):
+    mask = (1 << COLOR_BITS) - 1
+    half = 1 << (7 - COLOR_BITS)  # Centre of the quantisation bucket
+    b = (index >> (2 * COLOR_BITS)) & mask
+    g = (index >> COLOR_BITS) & mask
+    r = index & mask
+    return [int(c << (8 - COLOR_BITS)) + half for c in (b, g, r)]
+
+
+def color_histogram(image):
+    hist = np.bincount(quantize_colors(image), minlength=COLOR_BINS)
+    return hist.astype(np.float64) / max(1, hist.sum())
+
+
+def color_correlation(figma_image, ui_image):
+    """Pearson correlation of the quantised colour histograms (1.0 = identical)."""
+    figma_hist = color_histogram(figma_image)
+    ui_hist = color_histogram(ui_image)
+    figma_hist -= figma_hist.mean()
+    ui_hist -= ui_hist.mean()
+    denominator = np.sqrt((figma_hist**2).sum() * (ui_hist**2).sum())
+    if not denominator:
+        return 1.0
+    return float((figma_hist * ui_hist).sum() / denominator)
+
+
+def dominant_color(crop):
+    """Most frequent quantised colour in `crop` as [B, G, R]."""
+    if not crop.size:
+        return None
+    return _bin_to_bgr(int(np.bincount(quantize_colors(crop)).argmax()))
+
+
+def color_mismatches(matches, figma_image, ui_image):
+    """Matched elements whose dominant colours differ noticeably."""
+    mismatches = []
+    for f_el, u_el in matches:
+        figma_color = dominant_color(figma_image.crop(f_el["bbox"]))
+        ui_color = dominant_color(ui_image.crop(u_el["bbox"]))
+        if figma_color is None or ui_color is None:
+            continue
+        distance = float(np.linalg.norm(np.subtract(figma_color, ui_color)))
+        if distance > COLOR_DISTANCE_THRESHOLD:
+            mismatches.append(
+                {
+                    "label": f_el["label"],
+                    "ui_bbox": u_el["bbox"],
+                    "figma_color": figma_color,
+                    "ui_color": ui_color,
+                    "distance": round(distance, 1),
+                }
+            )
+    return mismatches
+
+
+def match_text_areas(figma_areas, ui_areas, threshold=20):
+    """
+    Index of the nearest UI text area within `threshold` px in x and y for each
+    Figma text area, or -1 where there is none.
+
+    UI areas are sorted by y once so each lookup only scans its y window.
+    """
+    matches = np.full(len(figma_areas), -1, dtype=np.int64)
+    if not len(figma_areas) or not len(ui_areas):
+        return matches
+
+    figma = np.asarray(figma_areas, dtype=np.int64).reshape(-1, 4)
+    ui = np.asarray(ui_areas, dtype=np.int64).reshape(-1, 4)
+    order = np.argsort(ui[:, 1], kind="stable")
+    ui_y = ui[order, 1]
+    lo = np.searchsorted(ui_y, figma[:, 1] - threshold, side="right")
+    hi = np.searchsorted(ui_y, figma[:, 1] + threshold, side="left")
+
+    for i in np.nonzero(hi > lo)[0]:
+        window = order[lo[i] : hi[i]]
+        dx = np.abs(ui[window, 0] - figma[i, 0])
+        dy = np.abs(ui[window, 1] - figma[i, 1])
+        close = dx < threshold
+        if close.any():
+            matches[i] = window[close][np.argmin((dx + dy)[close])]
+    return matches
+
+
+def font_size_mismatches(figma_areas, ui_areas, text_matches, figma_shape, ui_shape):
+    """
+    Compare text heights of matched regions as a font-size estimate.
+
+    Region height from `detect_text_areas` tracks the rendered glyph height,
+    so once Figma heights are scaled to the UI frame (as for buttons) a
+    relative change beyond FONT_SIZE_TOLERANCE flags a size change.
+    """
+    matched = np.nonzero(text_matches >= 0)[0]
+    if not len(matched):
+        return []
+
+    figma = np.asarray(figma_areas, dtype=np.int64).reshape(-1, 4)[matched]
+    ui = np.asarray(ui_areas, dtype=np.int64).reshape(-1, 4)[text_matches[matched]]
+    expected = figma[:, 3] * (ui_shape[0] / figma_shape[0])
+    delta = ui[:, 3] - expected
+    relative = np.abs(delta) / np.maximum(expected, 1)
+    flagged = (relative > FONT_SIZE_TOLERANCE) & (np.abs(delta) >= MIN_PIXEL_DELTA)
+
+    return [
+        {
+            "figma_region": figma[i].tolist(),
+            "ui_region": ui[i].tolist(),
+            "figma_height": int(figma[i, 3]),
+            "expected_height": round(float(expected[i]), 1),
+            "ui_height": int(ui[i, 3]),
+            "delta": round(float(delta[i]), 1),
+        }
+        for i in np.nonzero(flagged)[0]
+    ]
+
+
+def button_size_mismatches(matches, figma_shape, ui_shape):
+    """Matched buttons whose size differs once Figma is scaled to the UI frame."""
+    buttons = [(f, u) for f, u in matches if "button" in f["label"].lower()]
+    if not buttons:
+        return []
+
+    figma = np.array([f["bbox"] for f, _ in buttons], dtype=np.float64)
+    ui = np.array([u["bbox"] for _, u in buttons], dtype=np.float64)
+    scale = np.array([ui_shape[1] / figma_shape[1], ui_shape[0] / figma_shape[0]])
+    figma_size = (figma[:, 2:] - figma[:, :2]) * scale
+    ui_size = ui[:, 2:] - ui[:, :2]
+    delta = ui_size - figma_size
+    relative = np.abs(delta) / np.maximum(figma_size, 1)
+    flagged = (
+        (relative > BUTTON_SIZE_TOLERANCE) & (np.abs(delta) >= MIN_PIXEL_DELTA)
+    ).any(axis=1)
+
+    return [
+        {
+            "label": buttons[i][0]["label"],
+            "ui_bbox": buttons[i][1]["bbox"],
+            "expected_size": [round(v, 1) for v in figma_size[i].tolist()],
+            "actual_size": ui_size[i].tolist(),
+            "delta": [round(v, 1) for v in delta[i].tolist()],
+        }
+        for i in np.nonzero(flagged)[0]
+    ]
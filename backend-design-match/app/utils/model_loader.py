@@ -7,3 +7,14 @@ def load_deep_model():
     model = models.resnet18(weights=True)
     model.eval()  # Set model to evaluation mode
     return model
+
+
+_deep_model = None
+
+
+def get_deep_model():
+    """Load the deep model once per process and reuse it across requests."""
+    global _deep_model
+    if _deep_model is None:
+        _deep_model = load_deep_model()
+    return _deep_model
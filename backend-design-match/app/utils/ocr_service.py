@@ -1,16 +1,364 @@
 # app/utils/ocr_service.py
-import boto3
-from google.cloud import vision
+import itertools
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
+import cv2
+import pytesseract
+from utils.image_processing import as_image_context
+
+# Set Tesseract path
+pytesseract.pytesseract.tesseract_cmd = r"/usr/local/bin/tesseract"
+
+
+def google_ocr(image_bytes, timeout=None):
+    from google.cloud import vision
 
-def google_ocr(image_bytes):
     client = vision.ImageAnnotatorClient()
     image = vision.Image(content=image_bytes)
-    response = client.text_detection(image=image)
+    response = client.text_detection(image=image, timeout=timeout)
+    # Quota and auth failures come back in the response, not as an exception
+    if response.error.message:
+        raise RuntimeError(response.error.message)
     return response.text_annotations
 
 
-def aws_textract(image_bytes):
-    textract = boto3.client("textract")
+def aws_textract(image_bytes, timeout=None):
+    import boto3
+    from botocore.config import Config
+
+    config = Config(connect_timeout=timeout, read_timeout=timeout) if timeout else None
+    textract = boto3.client("textract", config=config)
     response = textract.detect_document_text(Document={"Bytes": image_bytes})
     return response["Blocks"]
+
+
+def _encode_png(context):
+    success, encoded_image = cv2.imencode(".png", context.image)
+    if not success:
+        raise ValueError("Failed to encode image for OCR.")
+    return encoded_image.tobytes()
+
+
+class OCRBackend:
+    """
+    Base class for OCR backends used by `OCRRouter`.
+
+    Subclasses implement `recognize`, which takes an ImageContext and returns
+    the extracted text ("" when nothing was found) or raises on failure.
+    """
+
+    name = "ocr"
+
+    def __init__(self, timeout=10.0, max_concurrency=4):
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+
+    def recognize(self, context):
+        raise NotImplementedError
+
+
+class TesseractBackend(OCRBackend):
+    name = "tesseract"
+
+    def __init__(self, timeout=15.0, max_concurrency=None):
+        # Tesseract runs locally, so its concurrency comes out of the CPU budget
+        if max_concurrency is None:
+            max_concurrency = int(os.getenv("OCR_MAX_CONCURRENCY", os.cpu_count() or 1))
+        super().__init__(timeout, max_concurrency)
+
+    def recognize(self, context):
+        # pytesseract kills the subprocess on timeout, freeing the slot and thread
+        return pytesseract.image_to_string(context.gray, timeout=self.timeout).strip()
+
+
+class GoogleVisionBackend(OCRBackend):
+    name = "google"
+
+    def recognize(self, context):
+        annotations = google_ocr(_encode_png(context), timeout=self.timeout)
+        if annotations:
+            return annotations[0].description.strip()
+        return ""
+
+
+class TextractBackend(OCRBackend):
+    name = "textract"
+
+    def recognize(self, context):
+        blocks = aws_textract(_encode_png(context), timeout=self.timeout)
+        lines = [b["Text"] for b in blocks if b.get("BlockType") == "LINE"]
+        return "\n".join(lines).strip()
+
+
+class StaticOCRBackend(OCRBackend):
+    """
+    Local stand-in backend for offline testing of routing behaviour.
+
+    Returns `text` after sleeping `delay` seconds, or raises if `fail` is set.
+    """
+
+    def __init__(self, text="", delay=0.0, fail=False, name="static", **kwargs):
+        super().__init__(**kwargs)
+        self.text = text
+        self.delay = delay
+        self.fail = fail
+        self.name = name
+        self.calls = 0
+
+    def recognize(self, context):
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} backend failure")
+        return self.text
+
+
+class CircuitBreaker:
+    """
+    Stops routing to a backend after `failure_threshold` consecutive failures.
+
+    After `reset_timeout` seconds one trial request is let through; success
+    closes the circuit again, failure re-opens it. A trial that ends without
+    either being recorded (e.g. it answered after its deadline) is closed
+    with `end_trial`, which re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at = None
+        self._trial = 0  # ID of the running half-open trial, 0 when none
+        self._trial_ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self._opened_at is not None
+
+    def admit(self):
+        """
+        Admit a call: returns None when blocked, 0 while the circuit is
+        closed, or the ID of the half-open trial this call was chosen for.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return 0
+            if self._trial:
+                return None
+            if time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._trial = next(self._trial_ids)  # Half-open: let one probe
+                return self._trial
+            return None
+
+    def allow(self):
+        return self.admit() is not None
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = 0
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial or self._failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial = 0
+
+    def end_trial(self, trial):
+        """Re-open the circuit if trial `trial` is still running unrecorded."""
+        with self._lock:
+            if trial and self._trial == trial:
+                self._opened_at = time.monotonic()
+                self._trial = 0
+
+
+class LatencyTracker:
+    """Rolling window of recent call latencies."""
+
+    def __init__(self, window=200):
+        self._samples = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, pct, min_samples=20):
+        """Latency at `pct` (0-100), or None until enough samples are recorded."""
+        with self._lock:
+            if len(self._samples) < min_samples:
+                return None
+            samples = sorted(self._samples)
+        index = min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))
+        return samples[index]
+
+
+class _Route:
+    def __init__(self, backend, breaker):
+        self.backend = backend
+        self.breaker = breaker
+        self.latency = LatencyTracker()
+        self.slots = threading.BoundedSemaphore(backend.max_concurrency)
+
+
+class OCRRouter:
+    """
+    Routes OCR requests over backends listed in priority order.
+
+    Each backend has its own timeout, concurrency limit and circuit breaker.
+    A request goes to the first available backend; if it has not answered
+    within its p95 latency (or `hedge_after` seconds until enough samples
+    exist) the next backend is fired as a hedge and the first non-empty
+    answer wins. Errors, timeouts and empty results fall through to the next
+    backend immediately.
+    """
+
+    def __init__(
+        self,
+        backends,
+        hedge_after=2.0,
+        hedge_percentile=95,
+        failure_threshold=3,
+        reset_timeout=30.0,
+    ):
+        self.routes = [
+            _Route(backend, CircuitBreaker(failure_threshold, reset_timeout))
+            for backend in backends
+        ]
+        self.hedge_after = hedge_after
+        self.hedge_percentile = hedge_percentile
+        self._executor = ThreadPoolExecutor(
+            max_workers=sum(b.max_concurrency for b in backends) or 1,
+            thread_name_prefix="ocr",
+        )
+
+    def _hedge_delay(self, route):
+        p95 = route.latency.percentile(self.hedge_percentile)
+        delay = self.hedge_after if p95 is None else p95
+        return min(delay, route.backend.timeout)
+
+    def _call(self, route, context, deadline, trial=0):
+        recorded = False
+        try:
+            timeout = max(0.0, deadline - time.monotonic())
+            if not route.slots.acquire(timeout=timeout):
+                raise TimeoutError(f"{route.backend.name} concurrency limit reached")
+            try:
+                started = time.monotonic()
+                try:
+                    text = route.backend.recognize(context)
+                except Exception:
+                    # A late error was already counted as a timeout by the router
+                    if time.monotonic() <= deadline:
+                        route.breaker.record_failure()
+                        recorded = True
+                    raise
+                finished = time.monotonic()
+                route.latency.record(finished - started)
+                # A late answer was already counted as a timeout by the router
+                if finished <= deadline:
+                    route.breaker.record_success()
+                    recorded = True
+                return text
+            finally:
+                route.slots.release()
+        finally:
+            # The router may have returned without scoring this call (a hedge
+            # won), so a trial must never be left half-open forever
+            if not recorded:
+                route.breaker.end_trial(trial)
+
+    def recognize(self, image):
+        """Return the first non-empty text from the routed backends, or ""."""
+        context = as_image_context(image)
+        pending = {}  # future -> (route, deadline)
+
+        def admitted():
+            for route in self.routes:
+                trial = route.breaker.admit()
+                if trial is not None:
+                    yield route, trial
+
+        candidates = admitted()
+
+        def launch_next():
+            route, trial = next(candidates, (None, 0))
+            if route is None:
+                return None
+            deadline = time.monotonic() + route.backend.timeout
+            future = self._executor.submit(self._call, route, context, deadline, trial)
+            pending[future] = (route, deadline)
+            return time.monotonic() + self._hedge_delay(route)
+
+        hedge_at = launch_next()
+        while pending:
+            now = time.monotonic()
+            wake_at = min(deadline for _, deadline in pending.values())
+            if hedge_at is not None:
+                wake_at = min(wake_at, hedge_at)
+            done, _ = wait(
+                pending, timeout=max(0.0, wake_at - now), return_when=FIRST_COMPLETED
+            )
+
+            for future in done:
+                route, _ = pending.pop(future)
+                try:
+                    text = future.result()
+                except Exception as e:
+                    print(f"❌ {route.backend.name} OCR error: {e}")
+                else:
+                    if text:
+                        return text
+                    print(f"⚠️ {route.backend.name} OCR returned empty")
+                hedge_at = launch_next()
+
+            now = time.monotonic()
+            for future, (route, deadline) in list(pending.items()):
+                if now >= deadline and not future.done():
+                    pending.pop(future)
+                    route.breaker.record_failure()
+                    print(f"⏱️ {route.backend.name} OCR timed out")
+                    hedge_at = launch_next()
+
+            if hedge_at is not None and now >= hedge_at:
+                hedge_at = launch_next()
+
+        return ""
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+BACKENDS = {
+    "tesseract": TesseractBackend,
+    "google": GoogleVisionBackend,
+    "textract": TextractBackend,
+}
+
+_router = None
+
+
+def get_ocr_router():
+    """
+    Process-wide router built from the OCR_BACKENDS environment variable.
+
+    OCR_BACKENDS is a comma-separated priority list (default
+    "tesseract,google"); OCR_HEDGE_AFTER sets the hedge delay in seconds
+    used until enough latency samples exist.
+    """
+    global _router
+    if _router is None:
+        names = os.getenv("OCR_BACKENDS", "tesseract,google").split(",")
+        backends = [BACKENDS[name.strip()]() for name in names if name.strip()]
+        _router = OCRRouter(
+            backends, hedge_after=float(os.getenv("OCR_HEDGE_AFTER", "2.0"))
+        )
+    return _router
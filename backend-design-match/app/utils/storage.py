@@ -0,0 +1,226 @@
+import glob
+import hashlib
+import os
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+import psutil
+
+storage_root = Path("temp") / "objects"
+
+# Temp files from interrupted writes are removed once they are this old
+STALE_TMP_SECONDS = 3600
+
+
+class ContentStore:
+    """
+    Content-addressed artifact storage with age/size-based LRU eviction.
+
+    Artifacts are named by the SHA-256 of their bytes and sharded into
+    `ab/cd/` subdirectories, so identical uploads are stored once and no
+    directory grows unbounded. Every access refreshes the file's mtime,
+    which eviction uses as its LRU clock.
+
+    Files in use are protected by leases: an in-process reference count per
+    file plus a marker in `leases/` named after the owning pid, so evictors
+    in other worker processes also skip them. Markers left by dead
+    processes are ignored and cleaned up.
+    """
+
+    def __init__(self, root=storage_root, max_age=24 * 3600, max_bytes=5 * 1024**3):
+        self.root = Path(root)
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self._lease_dir = self.root / "leases"
+        self._lease_dir.mkdir(parents=True, exist_ok=True)
+        self._refs = Counter()
+        self._markers = {}
+        self._lock = threading.Lock()
+        self._evictor = None
+
+    def path_for(self, key, suffix=""):
+        """Sharded location for an artifact with content key `key`."""
+        return self.root / key[:2] / key[2:4] / f"{key}{suffix}"
+
+    def contains(self, path):
+        try:
+            Path(path).resolve().relative_to(self.root.resolve())
+        except ValueError:
+            return False
+        return True
+
+    def put_bytes(self, data, suffix=""):
+        """Store `data` once and return its path; duplicates are only touched."""
+        path = self.path_for(hashlib.sha256(data).hexdigest(), suffix.lower())
+        if path.exists():
+            self.touch(path)
+            return path
+
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+        return path
+
+    def touch(self, path):
+        """Mark an artifact as recently used."""
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def acquire(self, path):
+        name = Path(path).name
+        with self._lock:
+            self._refs[name] += 1
+            if self._refs[name] == 1:
+                marker = self._lease_dir / f"{name}.{os.getpid()}.{uuid.uuid4().hex}"
+                marker.touch()
+                self._markers[name] = marker
+        self.touch(path)
+
+    def release(self, path):
+        name = Path(path).name
+        with self._lock:
+            self._refs[name] -= 1
+            if self._refs[name] > 0:
+                return
+            del self._refs[name]
+            marker = self._markers.pop(name, None)
+        if marker is not None:
+            marker.unlink(missing_ok=True)
+
+    @contextmanager
+    def lease(self, *paths):
+        """Protect store-managed `paths` from eviction for the duration."""
+        leased = [Path(p) for p in paths if p and self.contains(p)]
+        for path in leased:
+            self.acquire(path)
+        try:
+            yield
+        finally:
+            for path in leased:
+                self.release(path)
+
+    def _live_lease_names(self, markers):
+        names = set()
+        for marker in markers:
+            name, _, rest = marker.name.rpartition(".")[0].rpartition(".")
+            if not rest.isdigit():
+                continue
+            if psutil.pid_exists(int(rest)):
+                names.add(name)
+            else:
+                marker.unlink(missing_ok=True)
+        return names
+
+    def _leased_names(self):
+        return self._live_lease_names(self._lease_dir.iterdir())
+
+    def _is_leased(self, name):
+        markers = self._lease_dir.glob(f"{glob.escape(name)}.*")
+        return name in self._live_lease_names(markers)
+
+    def _unlink_unless_leased(self, path):
+        # Re-check just before deleting: a lease may have been taken after
+        # the snapshot that eviction started from
+        if self._is_leased(path.name):
+            return False
+        path.unlink(missing_ok=True)
+        return True
+
+    def _artifacts(self):
+        for dirpath, _, filenames in os.walk(self.root):
+            if Path(dirpath) == self._lease_dir:
+                continue
+            for filename in filenames:
+                path = Path(dirpath) / filename
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                yield path, stat.st_mtime, stat.st_size
+
+    def evict(self):
+        """
+        Delete artifacts older than `max_age`, then least recently used ones
+        until the store fits in `max_bytes`. Leased files are never removed.
+
+        Returns (files removed, bytes freed).
+        """
+        now = time.time()
+        leased = self._leased_names()
+        removed, freed = 0, 0
+        kept = []
+
+        for path, mtime, size in self._artifacts():
+            if path.name.endswith(".tmp"):
+                expired = now - mtime > STALE_TMP_SECONDS
+            else:
+                expired = now - mtime > self.max_age
+            if path.name in leased or not expired:
+                kept.append((mtime, size, path))
+                continue
+            if not self._unlink_unless_leased(path):
+                kept.append((mtime, size, path))
+                continue
+            removed, freed = removed + 1, freed + size
+
+        total = sum(size for _, size, _ in kept)
+        for mtime, size, path in sorted(kept):
+            if total <= self.max_bytes:
+                break
+            if path.name in leased or path.name.endswith(".tmp"):
+                continue
+            if not self._unlink_unless_leased(path):
+                continue
+            total -= size
+            removed, freed = removed + 1, freed + size
+
+        return removed, freed
+
+    def start_background_eviction(self, interval=300):
+        """Run `evict` every `interval` seconds on a daemon thread."""
+        if self._evictor is not None:
+            return
+
+        def run():
+            while True:
+                try:
+                    removed, freed = self.evict()
+                    if removed:
+                        print(f"🧹 Evicted {removed} files ({freed / 1e6:.1f} MB)")
+                except Exception as e:
+                    print(f"❌ Storage eviction error: {e}")
+                time.sleep(interval)
+
+        self._evictor = threading.Thread(
+            target=run, name="storage-evictor", daemon=True
+        )
+        self._evictor.start()
+
+
+_store = None
+
+
+def get_content_store():
+    """
+    Process-wide store configured from the environment.
+
+    STORAGE_ROOT overrides the location (default temp/objects);
+    STORAGE_MAX_AGE_HOURS (default 24) and STORAGE_MAX_GB (default 5) set
+    the eviction limits.
+    """
+    global _store
+    if _store is None:
+        _store = ContentStore(
+            root=os.getenv("STORAGE_ROOT", storage_root),
+            max_age=float(os.getenv("STORAGE_MAX_AGE_HOURS", "24")) * 3600,
+            max_bytes=int(float(os.getenv("STORAGE_MAX_GB", "5")) * 1024**3),
+        )
+    return _store
@@ -0,0 +1,167 @@
+import hashlib
+import os
+import uuid
+from pathlib import Path
+
+import cv2
+import numpy as np
+from utils.image_processing import COMPARE_WIDTH, ImageContext
+from utils.storage import get_content_store
+
+# Rows decoded/resized at a time when building whole-page views
+BAND_HEIGHT = 1024
+
+
+class StripReader:
+    """
+    Row-band access to a decoded image backed by a memory-mapped raw cache.
+
+    The source file is decoded once into an uncompressed `.npy` cache and
+    every later read is a view into the memory map, so pages are paged in
+    and dropped by the OS as tiles are consumed. Full-resolution pixels are
+    only ever resident one tile at a time; whole-page views (SSIM, colour
+    metrics and the report image) are built band by band at a reduced width
+    and still grow with page height, at roughly 1/4 the full-size cost for
+    a 1440 px wide capture.
+
+    The cache lives in the content store and is leased while the reader is
+    open, so eviction can reclaim it once no validation is using it. Uploads
+    build it ahead of time with `build_raw_cache`, so the one full-size
+    decode happens at upload rather than during validation.
+    """
+
+    def __init__(self, path, pixels, store=None):
+        self.path = path
+        self._pixels = pixels
+        self._store = store
+        self._downscaled = {}
+
+    @classmethod
+    def open(cls, path, store=None):
+        """Open `path` through the raw cache, returning None if it cannot be read."""
+        store = store or get_content_store()
+        cache_path = _cache_path(path, store)
+        if cache_path is None:
+            return None
+        store.acquire(cache_path)
+        try:
+            if not cache_path.exists() and not _decode_to_cache(path, cache_path):
+                store.release(cache_path)
+                return None
+            return cls(path, np.load(cache_path, mmap_mode="r"), store)
+        except Exception:
+            store.release(cache_path)
+            raise
+
+    @property
+    def shape(self):
+        return self._pixels.shape
+
+    @property
+    def height(self):
+        return self._pixels.shape[0]
+
+    @property
+    def width(self):
+        return self._pixels.shape[1]
+
+    def rows(self, start, stop):
+        """Zero-copy view of rows [start, stop)."""
+        return np.asarray(self._pixels[start:stop])
+
+    def crop(self, bbox):
+        """Zero-copy view of the (x1, y1, x2, y2) region in page coordinates."""
+        x1, y1, x2, y2 = bbox
+        return self.rows(max(0, y1), max(0, y2))[:, max(0, x1) : max(0, x2)]
+
+    def tiles(self, tile_height):
+        """Yield consecutive row tiles as ImageContexts carrying their offset."""
+        for y in range(0, self.height, tile_height):
+            yield ImageContext(
+                self.rows(y, min(y + tile_height, self.height)), offset=y
+            )
+
+    def downscaled(self, max_width=COMPARE_WIDTH):
+        """BGR page shrunk to at most `max_width` wide, built band by band."""
+        if max_width not in self._downscaled:
+            scale = min(1.0, max_width / self.width)
+            width = max(1, round(self.width * scale))
+            bands = []
+            for y in range(0, self.height, BAND_HEIGHT):
+                stop = min(y + BAND_HEIGHT, self.height)
+                rows = round(stop * scale) - round(y * scale)
+                if rows <= 0:
+                    continue
+                band = self.rows(y, stop)
+                bands.append(
+                    cv2.resize(band, (width, rows), interpolation=cv2.INTER_AREA)
+                )
+            self._downscaled[max_width] = np.vstack(bands)
+        return self._downscaled[max_width]
+
+    def downscaled_gray(self, max_width=COMPARE_WIDTH):
+        """Grayscale page shrunk to at most `max_width` wide."""
+        return cv2.cvtColor(self.downscaled(max_width), cv2.COLOR_BGR2GRAY)
+
+    def close(self):
+        if self._pixels is not None and self._store is not None:
+            self._store.release(self._pixels.filename)
+        self._pixels = None
+        self._downscaled.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def build_raw_cache(path, store=None):
+    """Decode `path` into its raw cache now; returns False if it cannot be read."""
+    store = store or get_content_store()
+    cache_path = _cache_path(path, store)
+    if cache_path is None:
+        return False
+    if cache_path.exists():
+        store.touch(cache_path)
+        return True
+    return _decode_to_cache(path, cache_path)
+
+
+def _cache_path(path, store):
+    """
+    Raw cache location keyed by the source's content, so leasing (which
+    touches the source) or re-uploading the same bytes never forces a re-decode.
+    """
+    if not os.path.isfile(path):
+        return None
+    if store.contains(path):
+        # Store-managed files are already named by the SHA-256 of their bytes
+        return store.path_for(Path(path).stem, ".npy")
+
+    digest = hashlib.sha256()
+    try:
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return store.path_for(digest.hexdigest(), ".npy")
+
+
+def _decode_to_cache(path, cache_path):
+    """Decode `path` once and persist the raw pixels for memory-mapped reads."""
+    image = cv2.imread(str(path))
+    if image is None:
+        return False
+
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_name(f"{cache_path.name}.{uuid.uuid4().hex}.tmp")
+    raw = np.lib.format.open_memmap(
+        tmp_path, mode="w+", dtype=image.dtype, shape=image.shape
+    )
+    raw[:] = image
+    raw.flush()
+    del raw, image
+    os.replace(tmp_path, cache_path)
+    return True
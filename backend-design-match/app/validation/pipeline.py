@@ -0,0 +1,416 @@
+import base64
+import os
+
+import cv2
+from dotenv import load_dotenv
+from fuzzywuzzy import fuzz
+from skimage.metrics import structural_similarity as ssim
+from utils.bbox_utils import match_elements
+from utils.embeddings import get_crop_embedder
+from utils.image_processing import (COMPARE_WIDTH, ImageContext,
+                                    as_image_context)
+from utils.metrics import (button_size_mismatches, color_correlation,
+                           color_mismatches, font_size_mismatches,
+                           match_text_areas)
+from utils.ocr_service import get_ocr_router
+from utils.strip_reader import StripReader
+
+load_dotenv()
+
+# Define YOLO model path
+model_path = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "model", "best_60k.pt")
+)
+
+# Width of the highlighted UI image embedded in the report
+REPORT_WIDTH = COMPARE_WIDTH
+RED, GREEN = (0, 0, 255), (0, 255, 0)
+
+# Rows of the downscaled pages compared per SSIM pass; bands need at least
+# the 7-row default SSIM window
+SSIM_BAND_HEIGHT = 256
+SSIM_MIN_ROWS = 7
+
+# Matched elements below this cosine similarity are reported as visual mismatches
+VISUAL_SIMILARITY_THRESHOLD = 0.8
+
+_model = None
+
+
+def get_model():
+    """Load the YOLO model on first use and reuse it for the life of the process."""
+    global _model
+    if _model is None:
+        from ultralytics import YOLO
+
+        if not os.path.exists(model_path):
+            raise FileNotFoundError(
+                f"\u274c Model file not found at: {os.path.abspath(model_path)}"
+            )
+
+        print(f"\u2705 Loading YOLO model from: {os.path.abspath(model_path)}")
+        _model = YOLO(model_path)
+        print("🎯 Model loaded successfully!")
+    return _model
+
+
+def detect_ui_elements(image):
+    results = get_model()(as_image_context(image).image)
+    elements = []
+    for r in results:
+        for box in r.boxes.data:
+            x1, y1, x2, y2, conf, cls = box.tolist()
+            elements.append(
+                {
+                    "label": r.names[int(cls)],
+                    "bbox": [int(x1), int(y1), int(x2), int(y2)],
+                    "confidence": round(conf * 100, 2),
+                }
+            )
+    return elements
+
+
+def compare_elements(figma_elements, ui_elements):
+    issues = []
+    figma_labels = {el["label"] for el in figma_elements}
+    ui_labels = {el["label"] for el in ui_elements}
+
+    missing_elements = figma_labels - ui_labels
+    extra_elements = ui_labels - figma_labels
+
+    for el in missing_elements:
+        issues.append(
+            {"type": "Missing Element", "description": f"{el} is missing in the UI"}
+        )
+    for el in extra_elements:
+        issues.append(
+            {"type": "Extra Element", "description": f"{el} is extra in the UI"}
+        )
+
+    return issues
+
+
+def extract_text(image):
+    """Extract text through the OCR router (Tesseract, then cloud fallbacks)."""
+    return get_ocr_router().recognize(as_image_context(image))
+
+
+def compare_text(figma_text, ui_text):
+    similarity = fuzz.ratio(figma_text, ui_text)
+    return similarity
+
+
+def compute_ssim(figma_image, ui_image):
+    # Compare on downscaled grayscale views; full resolution adds cost, not signal
+    ui_gray = as_image_context(ui_image).downscaled_gray()
+    figma_gray = as_image_context(figma_image).downscaled_gray()
+    if figma_gray.shape != ui_gray.shape:
+        figma_gray = cv2.resize(
+            figma_gray,
+            (ui_gray.shape[1], ui_gray.shape[0]),
+            interpolation=cv2.INTER_AREA,
+        )
+    # Score band by band, weighted by rows, so skimage's float buffers are
+    # bounded by the band height instead of growing with the page
+    height = ui_gray.shape[0]
+    starts = list(range(0, height, SSIM_BAND_HEIGHT))
+    if len(starts) > 1 and height - starts[-1] < SSIM_MIN_ROWS:
+        starts.pop()  # Fold a sliver too short for the SSIM window into its neighbour
+    total = 0.0
+    for start, stop in zip(starts, starts[1:] + [height]):
+        total += ssim(figma_gray[start:stop], ui_gray[start:stop]) * (stop - start)
+    return total / height
+
+
+def detect_text_areas(image):
+    binary = as_image_context(image).binary
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    text_regions = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if h > 10:
+            text_regions.append((x, y, w, h))
+    return text_regions
+
+
+def compare_element_visuals(figma_image, ui_image, element_matches):
+    """
+    Embed matched element crops from both images and score their similarity.
+
+    Returns (per-element results, issues, embedding throughput stats).
+    """
+    matches = []
+    for f_el, u_el in element_matches:
+        figma_crop = figma_image.crop(f_el["bbox"])
+        ui_crop = ui_image.crop(u_el["bbox"])
+        if figma_crop.size and ui_crop.size:
+            matches.append((f_el, u_el, figma_crop, ui_crop))
+
+    embedder = get_crop_embedder()
+    embeddings = embedder.embed([m[2] for m in matches] + [m[3] for m in matches])
+    figma_vectors, ui_vectors = embeddings[: len(matches)], embeddings[len(matches) :]
+    # Embeddings are L2-normalised, so the row-wise dot product is the cosine
+    similarities = (figma_vectors * ui_vectors).sum(axis=1)
+
+    results, issues = [], []
+    for (f_el, u_el, _, _), similarity in zip(matches, similarities):
+        similarity = round(float(similarity), 4)
+        results.append(
+            {
+                "label": f_el["label"],
+                "figma_bbox": f_el["bbox"],
+                "ui_bbox": u_el["bbox"],
+                "similarity": similarity,
+            }
+        )
+        if similarity < VISUAL_SIMILARITY_THRESHOLD:
+            issues.append(
+                {
+                    "type": "Visual Mismatch",
+                    "description": f"{f_el['label']} at {tuple(u_el['bbox'])} looks different from the design (similarity {similarity:.2f}).",
+                }
+            )
+
+    stats = {
+        "crops": len(matches) * 2,
+        "crops_per_second": round(embedder.crops_per_second(), 1),
+        "cache_hits": embedder.stats["cache_hits"],
+    }
+    return results, issues, stats
+
+
+def offset_text_areas(text_areas, offset):
+    """Translate slice-local text regions into page coordinates."""
+    return [(x, y + offset, w, h) for x, y, w, h in text_areas]
+
+
+def offset_elements(elements, offset):
+    """Translate slice-local element boxes into page coordinates."""
+    for el in elements:
+        x1, y1, x2, y2 = el["bbox"]
+        el["bbox"] = [x1, y1 + offset, x2, y2 + offset]
+    return elements
+
+
+def draw_region(image, region, scale_x, scale_y, color):
+    """Draw a page-coordinate (x, y, w, h) region onto a scaled copy of the page."""
+    x, y, w, h = region
+    cv2.rectangle(
+        image,
+        (int(x * scale_x), int(y * scale_y)),
+        (int((x + w) * scale_x), int((y + h) * scale_y)),
+        color,
+        1,
+    )
+
+
+def iter_validation(figma_path, ui_path, compare_visuals=False):
+    """
+    Validate a UI screenshot against a Figma design, yielding progress events.
+
+    Yields `(event, data)` tuples: one "slice" per UI tile as soon as its
+    detection and OCR finish (with page-coordinate partial results), then
+    "scores" with the full result minus the report image, then
+    "report_image" with the base64 PNG of the highlighted UI, drawn on the
+    page downscaled to REPORT_WIDTH.
+
+    With `compare_visuals`, matched elements are also compared by deep
+    embedding similarity to catch wrong icons, images or restyled controls.
+    """
+    figma_image = ImageContext.from_path(figma_path)
+    # The UI screenshot is read tile by tile from a memory-mapped cache
+    ui_image = StripReader.open(ui_path)
+
+    if figma_image is None or ui_image is None:
+        if ui_image is not None:
+            ui_image.close()
+        raise ValueError("Invalid image paths")
+
+    try:
+        # Dynamically determine max_height based on the uploaded image's height
+        image_height = ui_image.height
+        max_height = 1024  # Default threshold for slicing
+        if image_height < max_height:
+            max_height = image_height  # Use the image height itself if it's smaller
+
+        # Handle long images; each tile is released once it has been processed
+        combined_ui_elements, combined_ui_text, combined_ui_text_areas = [], "", []
+
+        for index, ui_slice in enumerate(ui_image.tiles(max_height)):
+            slice_elements = offset_elements(
+                detect_ui_elements(ui_slice), ui_slice.offset
+            )
+            slice_text = extract_text(ui_slice)
+            slice_text_areas = offset_text_areas(
+                detect_text_areas(ui_slice), ui_slice.offset
+            )
+            combined_ui_elements.extend(slice_elements)
+            combined_ui_text += " " + slice_text
+            combined_ui_text_areas.extend(slice_text_areas)
+            yield "slice", {
+                "index": index,
+                "offset": ui_slice.offset,
+                "height": ui_slice.height,
+                "page_height": image_height,
+                "elements": slice_elements,
+                "text": slice_text,
+                "text_areas": slice_text_areas,
+            }
+
+        figma_elements = detect_ui_elements(figma_image)
+        element_issues = compare_elements(figma_elements, combined_ui_elements)
+
+        figma_text = extract_text(figma_image)
+        text_similarity = compare_text(figma_text, combined_ui_text)
+
+        layout_similarity = compute_ssim(figma_image, ui_image)
+        figma_text_areas = detect_text_areas(figma_image)
+        text_alignment_issues = []
+        threshold = 20
+        text_matches = match_text_areas(
+            figma_text_areas, combined_ui_text_areas, threshold=threshold
+        )
+        element_matches = match_elements(
+            figma_elements, combined_ui_elements, figma_image.shape, ui_image.shape
+        )
+
+        # Metrics reuse the decoded pages and their cached downscaled views
+        metrics = {
+            "color_correlation": round(
+                color_correlation(figma_image.downscaled(), ui_image.downscaled()), 4
+            ),
+            "color_mismatches": color_mismatches(
+                element_matches, figma_image, ui_image
+            ),
+            "font_size_mismatches": font_size_mismatches(
+                figma_text_areas,
+                combined_ui_text_areas,
+                text_matches,
+                figma_image.shape,
+                ui_image.shape,
+            ),
+            "button_size_mismatches": button_size_mismatches(
+                element_matches, figma_image.shape, ui_image.shape
+            ),
+        }
+
+        element_similarities, visual_issues, embedding_stats = [], [], None
+        if compare_visuals:
+            (
+                element_similarities,
+                visual_issues,
+                embedding_stats,
+            ) = compare_element_visuals(figma_image, ui_image, element_matches)
+
+        # The report is drawn on the downscaled page, never the full-height one
+        highlighted_ui_image = ui_image.downscaled(REPORT_WIDTH).copy()
+        scale_x = highlighted_ui_image.shape[1] / ui_image.width
+        scale_y = highlighted_ui_image.shape[0] / ui_image.height
+
+        for (fx, fy, fw, fh), match in zip(figma_text_areas, text_matches):
+            if match < 0:
+                draw_region(
+                    highlighted_ui_image, (fx, fy, fw, fh), scale_x, scale_y, RED
+                )
+                text_alignment_issues.append(
+                    {
+                        "type": "Text Alignment",
+                        "description": f"Text region at ({fx}, {fy}, {fw}, {fh}) is misaligned or missing.",
+                    }
+                )
+
+        for region in combined_ui_text_areas:
+            draw_region(highlighted_ui_image, region, scale_x, scale_y, GREEN)
+
+        overall_match_score = round(
+            (layout_similarity * 100 * 0.6) + (text_similarity * 0.4), 2
+        )
+
+        issues = element_issues.copy()
+        if text_similarity < 90:
+            issues.append(
+                {
+                    "type": "Text Similarity",
+                    "description": f"Text similarity is {text_similarity}%, which is below the acceptable threshold.",
+                }
+            )
+        issues.extend(text_alignment_issues)
+        issues.extend(visual_issues)
+        issues.append(
+            {
+                "type": "Layout Similarity",
+                "description": f"Layout similarity score (SSIM): {layout_similarity:.2f}",
+            }
+        )
+
+        yield "scores", {
+            "issues": issues,
+            "overall_match_score": overall_match_score,
+            "layout_similarity": float(layout_similarity),
+            "text_similarity": text_similarity,
+            "metrics": metrics,
+            # Field-for-field input for reports.generate_report.ValidationResult
+            "validation_result": {
+                "similarity_score": overall_match_score,
+                "color_correlation": metrics["color_correlation"],
+                "layout_mismatches": element_issues + text_alignment_issues,
+                "font_size_mismatches": metrics["font_size_mismatches"],
+                "button_size_mismatches": metrics["button_size_mismatches"],
+            },
+            "element_similarities": element_similarities,
+            "embedding_stats": embedding_stats,
+        }
+
+        _, buffer = cv2.imencode(".png", highlighted_ui_image)
+        yield "report_image", {"report_image": base64.b64encode(buffer).decode("utf-8")}
+    finally:
+        ui_image.close()
+
+
+def run_validation(figma_path, ui_path, compare_visuals=False):
+    """Validate a UI screenshot against a Figma design and return the results."""
+    result = {}
+    for event, data in iter_validation(figma_path, ui_path, compare_visuals):
+        if event != "slice":
+            result.update(data)
+    return result
+
+
+def render_html_report(result):
+    """Render the HTML report for a result returned by `run_validation`."""
+    overall_match_score = result["overall_match_score"]
+    layout_similarity = result["layout_similarity"]
+    text_similarity = result["text_similarity"]
+    issues = result["issues"]
+    img_base64 = result["report_image"]
+
+    return f"""
+    <html>
+        <head>
+            <title>UI Validation Report</title>
+            <style>
+                body {{ font-family: Arial, sans-serif; }}
+                table {{ width: 90%; margin: auto; border-collapse: collapse; }}
+                th, td {{ padding: 10px; text-align: left; border: 1px solid #ddd; }}
+                th {{ background-color: #f4f4f4; }}
+                .issue-table {{ margin-top: 20px; }}
+                .score {{ font-size: 1.2em; }}
+                img {{ display: block; margin: auto; width: 70%; border: 3px solid #333; }}
+            </style>
+        </head>
+        <body>
+            <h1>UI Validation Results</h1>
+            <h2 class="score">Overall Match Score: {overall_match_score}%</h2>
+            <h3>Layout Similarity (SSIM): {layout_similarity:.2f}</h3>
+            <h3>Text Similarity: {text_similarity}%</h3>
+            <h2>Issues Detected:</h2>
+            <table class="issue-table">
+                <tr><th>Issue Type</th><th>Description</th></tr>
+                {''.join(f'<tr><td>{issue["type"]}</td><td>{issue["description"]}</td></tr>' for issue in issues)}
+            </table>
+            <h2>Visual Highlighting:</h2>
+            <p>Red boxes indicate missing/misaligned text regions in the UI compared to the Figma design. Green boxes mark detected text areas in the UI.</p>
+            <img src="data:image/png;base64,{img_base64}" alt="Highlighted UI Validation">
+        </body>
+    </html>
+    """
@@ -1,13 +1,15 @@
 import io
-from datetime import datetime
 from pathlib import Path
 from typing import Literal
 
 from auth.dependencies import get_current_user
 from fastapi import APIRouter, Depends, File, HTTPException, UploadFile, status
 from PIL import Image
-from utils.file_handler import save_upload_file
+from starlette.concurrency import run_in_threadpool
+from utils.file_handler import store_upload_file
 from utils.pdf_utils import pdf_to_images  # 🆕 You'll create this file
+from utils.storage import get_content_store
+from utils.strip_reader import build_raw_cache
 
 router = APIRouter()
 
@@ -30,26 +32,27 @@ def validate_file_type(file: UploadFile) -> None:
 async def process_upload(file: UploadFile, upload_type: Literal["figma", "ui"]) -> dict:
     validate_file_type(file)
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        original_name = Path(file.filename).stem
+        # Artifacts are named by content hash, so re-uploads are stored once
         extension = Path(file.filename).suffix.lower()
 
         if extension == ".pdf":
             contents = await file.read()
             images = pdf_to_images(contents)
+            store = get_content_store()
             paths = []
 
-            for idx, img in enumerate(images):
-                file_name = f"{upload_type}_{original_name}_{timestamp}_{idx}.png"
-                path = Path("temp") / file_name
-                img.save(path)
-                paths.append(str(path))
+            for img in images:
+                buffer = io.BytesIO()
+                img.save(buffer, format="PNG")
+                paths.append(str(store.put_bytes(buffer.getvalue(), ".png")))
 
             return {"file_paths": paths, "pages": len(paths)}
 
         else:
-            file_name = f"{upload_type}_{original_name}_{timestamp}{extension}"
-            file_path = await save_upload_file(file, Path("temp") / file_name)
+            file_path = await store_upload_file(file, extension)
+            if upload_type != "figma":
+                # Decode screenshots now so validation only reads the raw cache
+                await run_in_threadpool(build_raw_cache, file_path)
             return {"file_path": str(file_path)}
 
     except Exception as e:
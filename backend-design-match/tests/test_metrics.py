@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from utils.metrics import font_size_mismatches, match_text_areas
+
+
+def nested_loop_matches(figma_areas, ui_areas, threshold):
+    """The text-alignment check the pipeline used before match_text_areas."""
+    return [
+        any(
+            abs(fx - ux) < threshold and abs(fy - uy) < threshold
+            for ux, uy, uw, uh in ui_areas
+        )
+        for fx, fy, fw, fh in figma_areas
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_match_text_areas_agrees_with_nested_loop(seed):
+    rng = np.random.default_rng(seed)
+    threshold = 20
+
+    def areas(count):
+        # A narrow coordinate range makes boundary distances of exactly
+        # `threshold` common, where the strict comparison matters
+        xy = rng.integers(0, 200, size=(count, 2))
+        wh = rng.integers(1, 50, size=(count, 2))
+        return [tuple(map(int, row)) for row in np.hstack([xy, wh])]
+
+    figma_areas = areas(int(rng.integers(0, 40)))
+    ui_areas = areas(int(rng.integers(0, 40)))
+
+    matches = match_text_areas(figma_areas, ui_areas, threshold=threshold)
+
+    expected = nested_loop_matches(figma_areas, ui_areas, threshold)
+    assert (matches >= 0).tolist() == expected
+    for (fx, fy, _, _), index in zip(figma_areas, matches):
+        if index >= 0:
+            ux, uy, _, _ = ui_areas[index]
+            assert abs(fx - ux) < threshold and abs(fy - uy) < threshold
+
+
+def test_match_text_areas_picks_nearest():
+    figma_areas = [(100, 100, 50, 12)]
+    ui_areas = [(115, 110, 50, 12), (102, 101, 50, 12), (90, 95, 50, 12)]
+    assert match_text_areas(figma_areas, ui_areas).tolist() == [1]
+
+
+def test_font_size_scales_figma_to_ui_frame():
+    # A 2x Figma export: every region is twice as tall as the rendered UI
+    figma_areas = [(0, 0, 200, 40), (0, 100, 200, 40)]
+    ui_areas = [(0, 0, 100, 20), (0, 50, 100, 30)]
+    matches = np.array([0, 1])
+
+    mismatches = font_size_mismatches(
+        figma_areas, ui_areas, matches, (2000, 1440), (1000, 720)
+    )
+
+    assert len(mismatches) == 1
+    assert mismatches[0]["ui_region"] == [0, 50, 100, 30]
+    assert mismatches[0]["expected_height"] == 20.0
+    assert mismatches[0]["delta"] == 10.0
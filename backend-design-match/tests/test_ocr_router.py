@@ -0,0 +1,129 @@
+import time
+
+import pytest
+
+pytest.importorskip("cv2")
+pytest.importorskip("pytesseract")
+
+from utils.ocr_service import CircuitBreaker, OCRRouter, StaticOCRBackend  # noqa: E402
+
+IMAGE = object()  # Stand-in backends never look at the image
+
+
+@pytest.fixture
+def make_router():
+    routers = []
+
+    def make(backends, **kwargs):
+        router = OCRRouter(backends, **kwargs)
+        routers.append(router)
+        return router
+
+    yield make
+    for router in routers:
+        router.shutdown()
+
+
+def test_hedges_to_secondary_when_primary_is_slow(make_router):
+    primary = StaticOCRBackend("slow", delay=1.0, name="primary")
+    secondary = StaticOCRBackend("fast", name="secondary")
+    router = make_router([primary, secondary], hedge_after=0.1)
+
+    started = time.monotonic()
+    assert router.recognize(IMAGE) == "fast"
+    assert time.monotonic() - started < 0.5
+    assert secondary.calls == 1
+
+
+def test_timeout_falls_through_to_next_backend(make_router):
+    primary = StaticOCRBackend("late", delay=1.0, name="primary", timeout=0.1)
+    secondary = StaticOCRBackend("ok", name="secondary")
+    router = make_router([primary, secondary], hedge_after=5.0)
+
+    started = time.monotonic()
+    assert router.recognize(IMAGE) == "ok"
+    assert time.monotonic() - started < 0.5
+
+
+def test_empty_result_falls_through(make_router):
+    router = make_router(
+        [StaticOCRBackend("", name="empty"), StaticOCRBackend("text", name="full")]
+    )
+    assert router.recognize(IMAGE) == "text"
+
+
+def test_breaker_opens_then_half_opens(make_router):
+    primary = StaticOCRBackend("primary", fail=True, name="primary")
+    secondary = StaticOCRBackend("secondary", name="secondary")
+    router = make_router([primary, secondary], failure_threshold=2, reset_timeout=0.2)
+    breaker = router.routes[0].breaker
+
+    for _ in range(2):
+        assert router.recognize(IMAGE) == "secondary"
+    assert breaker.is_open
+
+    # Open: the primary is skipped entirely
+    router.recognize(IMAGE)
+    assert primary.calls == 2
+
+    # Half-open: one failing trial re-opens the circuit immediately
+    time.sleep(0.25)
+    router.recognize(IMAGE)
+    assert primary.calls == 3
+    assert breaker.is_open
+
+    # A successful trial closes it again
+    time.sleep(0.25)
+    primary.fail = False
+    assert router.recognize(IMAGE) == "primary"
+    assert not breaker.is_open
+
+
+def test_late_error_after_timeout_counts_once(make_router):
+    primary = StaticOCRBackend(fail=True, delay=0.3, name="primary", timeout=0.1)
+    router = make_router(
+        [primary, StaticOCRBackend("ok", name="secondary")], failure_threshold=2
+    )
+
+    assert router.recognize(IMAGE) == "ok"
+    time.sleep(0.4)  # Let the abandoned call finish with its error
+    assert not router.routes[0].breaker.is_open
+
+
+def test_trial_abandoned_by_hedge_reopens_circuit(make_router):
+    primary = StaticOCRBackend("primary", fail=True, name="primary", timeout=0.2)
+    secondary = StaticOCRBackend("secondary", name="secondary")
+    router = make_router(
+        [primary, secondary], hedge_after=0.05, failure_threshold=1, reset_timeout=0.2
+    )
+    breaker = router.routes[0].breaker
+
+    router.recognize(IMAGE)
+    assert breaker.is_open
+
+    # The trial outlives its deadline after the hedge has already answered
+    time.sleep(0.25)
+    primary.fail, primary.delay = False, 0.4
+    assert router.recognize(IMAGE) == "secondary"
+    time.sleep(0.5)
+
+    # The abandoned trial re-opened the circuit; the next one probes again
+    primary.delay = 0.0
+    time.sleep(0.25)
+    assert router.recognize(IMAGE) == "primary"
+    assert primary.calls == 3
+    assert not breaker.is_open
+
+
+def test_stale_trial_does_not_end_a_newer_one():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.0)
+    breaker.record_failure()
+    first = breaker.admit()
+    breaker.record_failure()
+    second = breaker.admit()
+
+    breaker.end_trial(first)
+    assert breaker.admit() is None  # The second trial is still running
+    breaker.record_success()
+    assert not breaker.is_open
+    assert second != first
@@ -0,0 +1,111 @@
+import os
+import time
+
+import pytest
+
+pytest.importorskip("psutil")
+
+from utils.storage import ContentStore  # noqa: E402
+
+DEAD_PID = 2**22 + 1  # Above the default Linux pid_max, so never a live process
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ContentStore(root=tmp_path / "objects", max_age=3600, max_bytes=10**9)
+
+
+def age(path, seconds):
+    stamp = time.time() - seconds
+    os.utime(path, (stamp, stamp))
+
+
+def test_identical_bytes_are_stored_once(store):
+    first = store.put_bytes(b"same", ".PNG")
+    second = store.put_bytes(b"same", ".png")
+    assert first == second
+    assert first.suffix == ".png"
+    assert first.parent.parent.parent == store.root
+
+
+def test_expired_artifacts_are_evicted(store):
+    old = store.put_bytes(b"old", ".png")
+    fresh = store.put_bytes(b"fresh", ".png")
+    age(old, 7200)
+
+    assert store.evict() == (1, 3)
+    assert not old.exists()
+    assert fresh.exists()
+
+
+def test_size_budget_evicts_least_recently_used_first(store):
+    paths = [store.put_bytes(bytes([i]) * 10, ".png") for i in range(3)]
+    for seconds, path in zip((30, 10, 20), paths):
+        age(path, seconds)
+    store.max_bytes = 15
+
+    assert store.evict() == (2, 20)
+    assert [p.exists() for p in paths] == [False, True, False]
+
+
+def test_touch_refreshes_lru_position(store):
+    older, newer = store.put_bytes(b"a" * 10, ".png"), store.put_bytes(b"b" * 10, "")
+    age(older, 60)
+    age(newer, 30)
+    store.touch(older)
+    store.max_bytes = 10
+
+    store.evict()
+    assert older.exists()
+    assert not newer.exists()
+
+
+def test_leased_artifacts_survive_eviction(store):
+    path = store.put_bytes(b"in use", ".png")
+    age(path, 7200)
+    store.max_bytes = 0
+
+    with store.lease(path):
+        store.acquire(path)  # Nested leases share one marker
+        store.release(path)
+        age(path, 7200)  # acquire touches the file; make it stale again
+        assert store.evict() == (0, 0)
+        assert path.exists()
+
+    assert not list(store._lease_dir.iterdir())
+    assert store.evict() == (1, 6)
+
+
+def test_lease_ignores_paths_outside_the_store(store, tmp_path):
+    outside = tmp_path / "outside.png"
+    outside.write_bytes(b"x")
+    with store.lease(outside, None):
+        assert not list(store._lease_dir.iterdir())
+
+
+def test_markers_from_dead_processes_are_ignored_and_removed(store):
+    path = store.put_bytes(b"orphaned", ".png")
+    age(path, 7200)
+    marker = store._lease_dir / f"{path.name}.{DEAD_PID}.abc"
+    marker.touch()
+
+    assert store.evict() == (1, 8)
+    assert not marker.exists()
+
+
+def test_lease_taken_during_the_walk_is_respected(store, monkeypatch):
+    path = store.put_bytes(b"late lease", ".png")
+    age(path, 7200)
+    artifacts = store._artifacts
+
+    def walk_then_lease():
+        for item in artifacts():
+            # Another request leases the file after eviction's snapshot
+            store.acquire(path)
+            age(path, 7200)
+            yield item
+
+    monkeypatch.setattr(store, "_artifacts", walk_then_lease)
+    assert store.evict() == (0, 0)
+    assert path.exists()
+    store.release(path)